@@ -6,70 +6,171 @@ All FilePath entries become real clickable links on GitHub.
 """
 
 import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import os
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
 import re
-import urllib.parse
-
+import tempfile
+
+
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+# Year folders sit at the top level or just below it; deeper parts are not scanned
+_YEAR_SCAN_DEPTH = 3
+
+# Same safe set as urllib.parse.quote(path, safe="/")
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9/\-._~]+")
+
+_PIPE_ESCAPE = str.maketrans({"|": "\\|"})
+# Rows are batched and flushed with os.write in chunks of about this size
+_WRITE_CHUNK = 1 << 20
+_TABLE_TEMPLATE = (
+    "#### {header}\n\n"
+    "| Filename | FilePath |\n"
+    "|----------|----------|\n"
+    "{rows}\n"
+    "\n"  # blank line after table
+)
+
+
+def _walk(dir_path: str, exclude_dirs: FrozenSet[str] = frozenset()):
+    """Yield every regular file under dir_path as an os.DirEntry.
+
+    Directories named in exclude_dirs are skipped without being opened, and
+    unreadable directories are skipped silently, as Path.rglob() does.
+    Symlinks to files are followed; symlinks to directories are not.
+    """
+    try:
+        it = os.scandir(dir_path)
+    except OSError:
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in exclude_dirs:
+                    yield from _walk(entry.path, exclude_dirs)
+            elif entry.is_file():
+                yield entry
+
+
+def _group_entries(entries, root_prefix: str, extensions: Set[str] | None):
+    """Group DirEntry objects into top-level dir → year → [(rel path, name), ...]"""
+    structure: Dict[str, Dict[int | None, List[Tuple[str, str]]]] = defaultdict(
+        lambda: defaultdict(list)
+    )
+    search = _YEAR_RE.search
+    # str.endswith takes a single suffix or a tuple of them
+    suffixes = None
+    if extensions:
+        suffixes = next(iter(extensions)) if len(extensions) == 1 else tuple(extensions)
+
+    for entry in entries:
+        if suffixes and not entry.name.lower().endswith(suffixes):
+            continue
 
-def extract_year(part: str) -> int:
-    m = re.search(r"\b(19\d{2}|20\d{2})\b", part)
-    return int(m.group(0)) if m else 999999
+        parts = entry.path[len(root_prefix):].split(os.sep)
+        top_level = parts[0]
 
+        # Find the first year folder near the top of the path
+        year: int | None = None
+        for part in parts[:_YEAR_SCAN_DEPTH]:
+            m = search(part)
+            if m:
+                year = int(m.group(0))
+                break
 
-def group_files(root_dir: Path, extensions: Set[str] | None = None):
-    structure: Dict[str, Dict[int | None, List[Path]]] = {}
+        structure[top_level][year].append(("/".join(parts), entry.name))
 
-    for file_path in root_dir.rglob("*"):
-        if not file_path.is_file():
-            continue
-        if extensions and file_path.suffix.lower() not in extensions:
-            continue
+    return structure
 
-        rel = file_path.relative_to(root_dir)
-        if not rel.parts:
-            continue
 
-        top_level = rel.parts[0]
+def _default_jobs() -> int:
+    return min(32, (os.cpu_count() or 1) * 4)
 
-        # Find the first year folder in the path
-        year: int | None = None
-        for part in rel.parts:
-            y = extract_year(part)
-            if y != 999999:
-                year = y
-                break
 
-        structure.setdefault(top_level, {})
-        structure[top_level].setdefault(year, []).append(file_path)
+def group_files(
+    root_dir: str | os.PathLike[str],
+    extensions: Set[str] | None = None,
+    jobs: int | None = None,
+    exclude_dirs: Iterable[str] = (),
+):
+    """Map top-level dir → year → [(relative posix path, file name), ...]
+
+    Each top-level directory is walked in its own worker thread; scandir
+    releases the GIL, so slow or networked filesystems overlap their I/O.
+    """
+    root_str = os.path.abspath(os.fspath(root_dir))
+    root_prefix = os.path.join(root_str, "")
+    exclude_dirs = frozenset(exclude_dirs)
+
+    top_files = []
+    top_dirs = []
+    try:
+        it = os.scandir(root_str)
+    except OSError:
+        return defaultdict(lambda: defaultdict(list))
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in exclude_dirs:
+                    top_dirs.append(entry.path)
+            elif entry.is_file():
+                top_files.append(entry)
+
+    structure = _group_entries(top_files, root_prefix, extensions)
+
+    with ThreadPoolExecutor(max_workers=jobs or _default_jobs()) as pool:
+        futures = [
+            pool.submit(_group_entries, _walk(path, exclude_dirs), root_prefix, extensions)
+            for path in top_dirs
+        ]
+        # Top-level directory names are unique, so results never overlap
+        for future in futures:
+            structure.update(future.result())
 
     return structure
 
 
-def github_link(rel_path: Path) -> str:
+def _path_sort_key(item: Tuple[str, str]) -> str:
+    """Order like Path objects: "/" sorts below every character in a name."""
+    return item[0].replace("/", "\0")
+
+
+def _percent_encode(m: re.Match) -> str:
+    return "".join(f"%{b:02X}" for b in m.group(0).encode("utf-8"))
+
+
+def github_link(rel_path: str) -> str:
     """[path/to/file](encoded-path) – works perfectly on GitHub"""
-    path_str = rel_path.as_posix()
-    encoded = urllib.parse.quote(path_str, safe="/")
-    return f"[{path_str}]({encoded})"
+    encoded = _UNSAFE_RE.sub(_percent_encode, rel_path)
+    return f"[{rel_path}]({encoded})"
 
 
-def generate_markdown_inventory(
-    root_dir: Path,
-    extensions: Set[str] | None = None,
-    output_file: Path | None = None,
-) -> str:
-    root_dir = root_dir.resolve()
-    lines: List[str] = []
+def _write_all(fd: int, data: bytearray) -> None:
+    """os.write() until every byte of data is out; it may write partially."""
+    with memoryview(data) as view:
+        written = 0
+        while written < len(view):
+            written += os.write(fd, view[written:])
+
 
-    lines.append("# Snowden Archive – File Inventory\n")
-    lines.append("> Auto-generated • All paths are clickable on GitHub\n")
-    lines.append("## Directories\n")
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
 
-    structure = group_files(root_dir, extensions)
+
+def _render_inventory(structure, write) -> int:
+    """Emit the markdown through write(); returns the number of files listed."""
     total = 0
 
+    write("# Snowden Archive – File Inventory\n\n")
+    write("> Auto-generated • All paths are clickable on GitHub\n\n")
+    write("## Directories\n")
+
     for top_dir in sorted(structure.keys()):
-        lines.append(f"### {top_dir}\n")
+        write(f"\n### {top_dir}\n\n")
 
         year_groups = structure[top_dir]
         years = sorted(y for y in year_groups if y is not None)
@@ -77,36 +178,64 @@ def generate_markdown_inventory(
             years.append(None)
 
         for year in years:
-            files = sorted(year_groups[year], key=lambda p: p.relative_to(root_dir))
+            files = sorted(year_groups[year], key=_path_sort_key)
             total += len(files)
             if not files:
                 continue
 
             header = "No Year Folder" if year is None else str(year)
-            lines.append(f"#### {header}\n")
+            rows = [
+                f"| {name.translate(_PIPE_ESCAPE)} | {github_link(rel)} |"
+                for rel, name in files
+            ]
+            write(_TABLE_TEMPLATE.format(header=header, rows="\n".join(rows)))
 
-            lines.append("| Filename | FilePath |")
-            lines.append("|----------|----------|")
+        write("---\n")
 
-            for fp in files:
-                rel = fp.relative_to(root_dir)
-                name = fp.name.replace("|", "\\|")
-                link = github_link(rel)
-                lines.append(f"| {name} | {link} |")
+    return total
 
-            lines.append("")  # blank line after table
-
-        lines.append("---\n")
-
-    content = "\n".join(lines).rstrip() + "\n"
-
-    if output_file:
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        output_file.write_text(content, encoding="utf-8")
-        print(f"Success: GitHub-ready inventory saved → {output_file}")
 
+def generate_markdown_inventory(
+    root_dir: Path,
+    extensions: Set[str] | None = None,
+    output_file: Path = Path("INVENTORY.md"),
+    jobs: int | None = None,
+    exclude_dirs: Iterable[str] = (),
+) -> int:
+    """Stream the inventory straight to output_file; returns the file count."""
+    structure = group_files(root_dir, extensions, jobs, exclude_dirs)
+
+    # Write beside output_file and swap it in at the end, so a failed run
+    # leaves the previous inventory untouched
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_file.parent, suffix=".tmp")
+    buf = bytearray()
+
+    def write(text: str) -> None:
+        buf.extend(text.encode("utf-8"))
+        if len(buf) > _WRITE_CHUNK:
+            _write_all(fd, buf)
+            buf.clear()
+
+    try:
+        try:
+            total = _render_inventory(structure, write)
+            _write_all(fd, buf)
+        finally:
+            os.close(fd)
+        # mkstemp creates the file 0600; give it the usual 0644 less umask
+        os.chmod(tmp_path, 0o644 & ~_current_umask())
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    print(f"Success: GitHub-ready inventory saved → {output_file}")
     print(f"Success: {total} files in {len(structure)} top-level directories")
-    return content
+    return total
 
 
 def main():
@@ -125,6 +254,13 @@ def main():
         dest="extensions",          # ← this was missing before!
         help="Filter by extension, e.g. --ext .pdf --ext .md (repeatable)",
     )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="Skip every directory with this name, e.g. --exclude-dir .git (repeatable)",
+    )
     parser.add_argument(
         "-o",
         "--output",
@@ -132,6 +268,13 @@ def main():
         default=Path("INVENTORY.md"),
         help="Output file (default: INVENTORY.md)",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=_default_jobs(),
+        help="Threads used to scan top-level directories in parallel (default: %(default)s)",
+    )
     args = parser.parse_args()
 
     root = Path(args.directory).resolve()
@@ -149,8 +292,12 @@ def main():
     print(f"Scanning: {root}")
     if extensions_set:
         print(f"Only including: {', '.join(sorted(extensions_set))}")
+    if args.exclude_dir:
+        print(f"Skipping directories: {', '.join(sorted(set(args.exclude_dir)))}")
 
-    generate_markdown_inventory(root, extensions_set, args.output)
+    generate_markdown_inventory(
+        root, extensions_set, args.output, max(1, args.jobs), args.exclude_dir
+    )
 
     print(f"\nFinished! Commit '{args.output}' to your repository root.")
     print("Every FilePath will now be a working link on GitHub.")
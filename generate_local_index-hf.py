@@ -7,11 +7,18 @@ Usage:
     python generate_index.py --hf --fallback-local  # Prefer HF, fallback to local
 """
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+import json
+import operator
+import os
 import urllib.parse
 import re
 import argparse
 import sys
+import tempfile
 
 try:
     from huggingface_hub import HfApi, list_repo_files
@@ -22,23 +29,84 @@ except ImportError:
 
 
 HF_REPO_ID = "yukioitsuki/snowden_archived"
+HF_CACHE_DIR = Path(".hf_cache")
 api = HfApi()
 
 
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+# Year folders sit at the top level or just below it; deeper parts are not scanned
+_YEAR_SCAN_DEPTH = 3
+
+_PIPE_TRANS = str.maketrans({"|": "Vertical Bar"})
+
+
 def extract_year_from_path(path_parts):
-    """Find the first 19xx or 20xx year in any part of the path"""
-    for part in path_parts:
-        match = re.search(r"\b(19\d{2}|20\d{2})\b", part)
+    """Find the first 19xx or 20xx year in the top parts of the path"""
+    search = _YEAR_RE.search
+    for part in path_parts[:_YEAR_SCAN_DEPTH]:
+        match = search(part)
         if match:
             return int(match.group(0))
     return None
 
 
+@lru_cache(maxsize=None)
+def _quote_url_prefix(dir_prefix):
+    """Encoded HF download URL for a directory; shared by every file inside it"""
+    hf_url = f"https://huggingface.co/datasets/{HF_REPO_ID}/resolve/main/{dir_prefix}"
+    return urllib.parse.quote(hf_url, safe=":/")
+
+
+def _read_cached_listing(cache):
+    """Cached HF file list, or None if it is missing or unreadable"""
+    try:
+        files = json.loads(cache.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable cache {cache}: {e}")
+        return None
+    if not isinstance(files, list):
+        print(f"Ignoring malformed cache {cache}")
+        return None
+    return files
+
+
+def _write_cached_listing(cache, files):
+    """Save the HF file list atomically; a failed write only costs the cache"""
+    tmp_path = None
+    try:
+        cache.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            json.dump(files, tmp)
+        os.replace(tmp_path, cache)
+    except OSError as e:
+        print(f"Warning: could not write cache {cache}: {e}")
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
 def get_pdf_files_from_hf():
     """Fetch list of all PDF files from the Hugging Face dataset"""
     print(f"Fetching file list from Hugging Face dataset: {HF_REPO_ID}")
     try:
-        files = list_repo_files(repo_id=HF_REPO_ID, repo_type="dataset")
+        # The listing only changes with a new commit, so cache it per SHA
+        sha = api.dataset_info(HF_REPO_ID).sha
+        if not sha:
+            # No revision to key on: list directly and leave the cache alone
+            files = list_repo_files(repo_id=HF_REPO_ID, repo_type="dataset")
+        else:
+            cache = HF_CACHE_DIR / f"{sha}.json"
+            files = _read_cached_listing(cache)
+            if files is not None:
+                print(f"Using cached file list for revision {sha}")
+            else:
+                files = list_repo_files(repo_id=HF_REPO_ID, repo_type="dataset", revision=sha)
+                _write_cached_listing(cache, files)
         pdf_files = [f for f in files if f.lower().endswith(".pdf")]
         print(f"Found {len(pdf_files)} PDF files on Hugging Face")
         return pdf_files
@@ -47,89 +115,137 @@ def get_pdf_files_from_hf():
         return []
 
 
-def scan_local_pdfs(root="."):
-    """Original local scanning logic"""
-    print("Scanning local directory for PDF files (excluding .files folders)...")
-    root_path = Path(root)
+def _walk_pdfs(dir_path, excluded):
+    """Yield PDF entries under dir_path, pruning .files folders into excluded"""
+    try:
+        it = os.scandir(dir_path)
+    except OSError:
+        return  # unreadable folder, skipped like rglob() did
+    with it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                if e.name == ".files":
+                    excluded.append(e.path)
+                    continue
+                yield from _walk_pdfs(e.path, excluded)
+            elif e.is_file() and e.name.lower().endswith(".pdf"):
+                yield e
+
+
+def _pdf_entries(entries, root):
+    """Turn PDF DirEntry objects into index entries relative to root"""
     pdf_files = []
-    excluded = 0
-
-    for p in root_path.rglob("*.pdf"):
-        if ".files" in p.parts:
-            excluded += 1
-            continue
-        if not p.is_file():
-            continue
-
-        rel = p.relative_to(root_path)
-        year = extract_year_from_path(rel.parts)
+    for e in entries:
+        rel = os.path.relpath(e.path, root)
+        if os.sep != "/":
+            rel = rel.replace(os.sep, "/")
+        year = extract_year_from_path(rel.split("/"))
 
         pdf_files.append({
-            "path": str(rel.as_posix()),
-            "name": p.name,
+            "path": rel,
+            "lower_path": rel.lower(),
+            "name": e.name,
             "year": year
         })
+    return pdf_files
+
+
+def _default_jobs():
+    return min(32, (os.cpu_count() or 1) * 4)
 
-    print(f"Found {len(pdf_files)} local PDF files ({excluded} excluded)")
+
+def scan_local_pdfs(root=".", jobs=None):
+    """Original local scanning logic, one worker thread per top-level folder"""
+    print("Scanning local directory for PDF files (excluding .files folders)...")
+    excluded = []
+    top_files = []
+    top_dirs = []
+
+    try:
+        with os.scandir(root) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):
+                    if e.name == ".files":
+                        excluded.append(e.path)
+                    else:
+                        top_dirs.append(e.path)
+                elif e.is_file() and e.name.lower().endswith(".pdf"):
+                    top_files.append(e)
+    except OSError as err:
+        print(f"Cannot read {root}: {err}")
+
+    pdf_files = _pdf_entries(top_files, root)
+
+    # scandir releases the GIL, so the subtree walks overlap their I/O
+    with ThreadPoolExecutor(max_workers=jobs or _default_jobs()) as pool:
+        futures = [
+            pool.submit(_pdf_entries, _walk_pdfs(d, excluded), root)
+            for d in top_dirs
+        ]
+        for future in futures:
+            pdf_files.extend(future.result())
+
+    print(f"Found {len(pdf_files)} local PDF files ({len(excluded)} .files folders skipped)")
     return pdf_files
 
 
 def generate_html(pdf_entries, total_files):
     """Generate HTML content from list of entries"""
+    # Load template up front and split it around the injection point
+    template_path = Path("templates.html")
+    if not template_path.exists():
+        print("Error: templates.html not found!")
+        sys.exit(1)
+
+    template = template_path.read_text(encoding="utf-8")
+    head, injected, tail = template.partition("<!-- INJECTED_CONTENT -->")
+    total_str = str(total_files)
+    head = head.replace("{TOTAL_FILES}", total_str)
+    tail = tail.replace("{TOTAL_FILES}", total_str)
+
     # Group: top-level directory → year (or None) → files
-    grouped = {}
+    grouped = defaultdict(lambda: defaultdict(list))
     for f in pdf_entries:
         path = f["path"]
         top_dir = path.split("/", 1)[0] if "/" in path else path.split("/", 1)[0]
-        year_key = f["year"] if f["year"] else "no-year"
-        grouped.setdefault(top_dir, {}).setdefault(year_key, []).append(f)
+        grouped[top_dir][f["year"]].append(f)
 
-    content = ""
+    buf = []
+    add = buf.append
     for top_dir in sorted(grouped.keys()):
-        content += f'<div class="directory collapsed">\n'
-        content += f'  <div class="dir-header">{top_dir}<span class="arrow"></span></div>\n'
-        content += f'  <div class="content">\n'
-
-        year_map = {}
-        for y_key, flist in grouped[top_dir].items():
-            display = "No Year Folder" if y_key == "no-year" else str(y_key)
-            year_map[display] = sorted(flist, key=lambda x: x["path"].lower())
-
-        sorted_years = sorted(
-            (y for y in year_map.keys() if y != "No Year Folder"),
-            key=int
-        )
-        if "No Year Folder" in year_map:
-            sorted_years.append("No Year Folder")
-
-        for year_name in sorted_years:
-            files = year_map[year_name]
-            content += f'    <div class="year collapsed">\n'
-            content += f'      <div class="year-header">{year_name} <span class="count">({len(files)} PDFs)</span><span class="arrow"></span></div>\n'
-            content += f'      <div class="content">\n'
-            content += '        <div class="table-wrapper"><table><thead><tr><th>Document</th><th>Path</th></tr></thead><tbody>\n'
+        add(f'<div class="directory collapsed">\n')
+        add(f'  <div class="dir-header">{top_dir}<span class="arrow"></span></div>\n')
+        add(f'  <div class="content">\n')
+
+        year_map = grouped[top_dir]
+        sorted_years = sorted(y for y in year_map if y is not None)
+        if None in year_map:
+            sorted_years.append(None)
+
+        for year in sorted_years:
+            files = sorted(year_map[year], key=operator.itemgetter("lower_path"))
+            year_name = "No Year Folder" if year is None else str(year)
+            add(f'    <div class="year collapsed">\n')
+            add(f'      <div class="year-header">{year_name} <span class="count">({len(files)} PDFs)</span><span class="arrow"></span></div>\n')
+            add(f'      <div class="content">\n')
+            add('        <div class="table-wrapper"><table><thead><tr><th>Document</th><th>Path</th></tr></thead><tbody>\n')
             for f in files:
-                safe_name = f["name"].replace("|", "Vertical Bar")
+                safe_name = f["name"].translate(_PIPE_TRANS)
                 # Use direct HF URL for download
-                hf_url = f"https://huggingface.co/datasets/{HF_REPO_ID}/resolve/main/{f['path']}"
-                link = urllib.parse.quote(hf_url, safe=":/")
-                content += f'          <tr><td><a href="{link}" target="_blank">{safe_name}</a></td><td><code>{f["path"]}</code></td></tr>\n'
-            content += '        </tbody></table></div>\n'
-            content += '      </div></div>\n'
+                dir_, sep, base = f["path"].rpartition("/")
+                link = _quote_url_prefix(dir_ + sep) + urllib.parse.quote(base, safe=":/")
+                add(f'          <tr><td><a href="{link}" target="_blank">{safe_name}</a></td><td><code>{f["path"]}</code></td></tr>\n')
+            add('        </tbody></table></div>\n')
+            add('      </div></div>\n')
 
-        content += '  </div></div>\n'
-
-    # Load template
-    template_path = Path("templates.html")
-    if not template_path.exists():
-        print("Error: templates.html not found!")
-        sys.exit(1)
+        add('  </div></div>\n')
 
-    template = template_path.read_text(encoding="utf-8")
-    final_html = template.replace("{TOTAL_FILES}", str(total_files)) \
-                         .replace("<!-- INJECTED_CONTENT -->", content)
+    with open("index_local.html", "w", encoding="utf-8") as out:
+        out.write(head)
+        if injected:
+            out.writelines(buf)
+            out.write(tail)
 
-    Path("index_local.html").write_text(final_html, encoding="utf-8")
     print(f"\nSuccess: index_local.html generated with {total_files} PDFs")
     print("   → Links point directly to Hugging Face (no local files needed)")
     print("   → Double-click index_local.html → full offline-capable index!")
@@ -139,6 +255,7 @@ def main():
     parser = argparse.ArgumentParser(description="Generate Snowden Archive index")
     parser.add_argument("--hf", action="store_true", help="Use Hugging Face dataset instead of local files")
     parser.add_argument("--fallback-local", action="store_true", help="If HF fails, fall back to local scan")
+    parser.add_argument("-j", "--jobs", type=int, default=_default_jobs(), help="Threads for the local scan (default: %(default)s)")
     args = parser.parse_args()
 
     pdf_entries = []
@@ -147,24 +264,25 @@ def main():
         hf_files = get_pdf_files_from_hf()
         if hf_files:
             pdf_entries = []
+            # HF paths are always POSIX-style, so plain string splits suffice
             for path in hf_files:
-                name = Path(path).name
-                parts = Path(path).parts
-                year = extract_year_from_path(parts)
+                name = path.rpartition("/")[2]
+                year = extract_year_from_path(path.split("/", _YEAR_SCAN_DEPTH))
                 pdf_entries.append({
                     "path": path,
+                    "lower_path": path.lower(),
                     "name": name,
                     "year": year
                 })
         else:
             if args.fallback_local:
                 print("Falling back to local files...")
-                pdf_entries = scan_local_pdfs()
+                pdf_entries = scan_local_pdfs(jobs=max(1, args.jobs))
             else:
                 print("No files found and no fallback enabled.")
                 sys.exit(1)
     else:
-        pdf_entries = scan_local_pdfs()
+        pdf_entries = scan_local_pdfs(jobs=max(1, args.jobs))
 
     if not pdf_entries:
         print("No PDF files found.")
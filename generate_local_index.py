@@ -10,10 +10,14 @@ from pathlib import Path
 import urllib.parse
 import re
 
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
 def extract_year_from_path(path_parts):
     """Find the first 19xx or 20xx year in any part of the path"""
+    search = _YEAR_RE.search
     for part in path_parts:
-        match = re.search(r"\b(19\d{2}|20\d{2})\b", part)
+        match = search(part)
         if match:
             return int(match.group(0))
     return None